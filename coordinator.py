@@ -0,0 +1,118 @@
+# coordinator.py
+import os
+from fastapi import FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel
+from pmsm.node_registry import NodeRegistry, NodeError
+from pmsm import compression
+
+app = FastAPI()
+registry = NodeRegistry.from_file(os.environ.get("PMSM_NODES", "nodes.json"))
+
+class CommandModel(BaseModel):
+    command: str
+
+def _forward(method, instance_name, path, **kwargs):
+    try:
+        return registry.forward(method, instance_name, path, **kwargs)
+    except NodeError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+def _node_errors(errors):
+    return {name: str(e.detail) for name, e in errors.items()}
+
+@app.on_event("shutdown")
+def close_registry():
+    registry.close()
+
+@app.get("/nodes")
+def list_nodes():
+    results, errors = registry.refresh()
+    nodes = []
+    for name, node in registry.nodes.items():
+        nodes.append({
+            "name": name,
+            "url": node.url,
+            "online": name in results,
+            "instances": results.get(name, [])
+        })
+    return {"status": "success", "nodes": nodes, "errors": _node_errors(errors)}
+
+@app.get("/instances")
+def list_instances():
+    results, errors = registry.refresh()
+    return {
+        "status": "success",
+        "instances": sorted(registry.owners),
+        "owners": dict(registry.owners),
+        "errors": _node_errors(errors)
+    }
+
+@app.post("/cmd/{instance_name}")
+def send_command(instance_name: str, command_data: CommandModel):
+    return _forward("POST", instance_name, f"/cmd/{instance_name}",
+                    json={"command": command_data.command})
+
+@app.post("/start/{instance_name}")
+def start_instance(instance_name: str):
+    return _forward("POST", instance_name, f"/start/{instance_name}")
+
+@app.post("/stop/{instance_name}")
+def stop_instance(instance_name: str):
+    return _forward("POST", instance_name, f"/stop/{instance_name}")
+
+@app.post("/force_stop/{instance_name}")
+def force_stop_instance(instance_name: str):
+    return _forward("POST", instance_name, f"/force_stop/{instance_name}")
+
+@app.post("/backup/{instance_name}")
+def backup_instance(instance_name: str):
+    # 备份可能耗时较长，不受节点默认超时限制
+    return _forward("POST", instance_name, f"/backup/{instance_name}", timeout=None)
+
+@app.get("/backups/{instance_name}")
+def list_backups(instance_name: str):
+    return _forward("GET", instance_name, f"/backups/{instance_name}")
+
+@app.post("/restore/{instance_name}/{backup_id}")
+def restore_backup(instance_name: str, backup_id: str):
+    return _forward("POST", instance_name, f"/restore/{instance_name}/{backup_id}", timeout=None)
+
+@app.get("/logs/{instance_name}")
+def get_logs(
+    instance_name: str,
+    request: Request,
+    start_id: int = None,
+    start_id_min: int = None,
+    start_id_max: int = None,
+    start_time: str = None,
+    end_time: str = None,
+    search: str = None,
+    format: str = "rows"
+):
+    if format not in ("rows", "columnar"):
+        raise HTTPException(status_code=400, detail="Invalid format, expected 'rows' or 'columnar'")
+
+    params = {
+        "start_id": start_id,
+        "start_id_min": start_id_min,
+        "start_id_max": start_id_max,
+        "start_time": start_time,
+        "end_time": end_time,
+        "search": search
+    }
+    params = {key: value for key, value in params.items() if value is not None}
+    columnar = format == "columnar"
+
+    try:
+        merged, errors = registry.get_logs(instance_name, params, columnar=columnar)
+    except NodeError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    if columnar:
+        body, headers = compression.encode_json(
+            {"status": "success", "format": "columnar", **merged, "errors": _node_errors(errors)},
+            request.headers.get("accept-encoding")
+        )
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    return {"status": "success", **merged, "errors": _node_errors(errors)}
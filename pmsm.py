@@ -2,22 +2,64 @@ import argparse
 import requests
 import sys
 import json
+from pmsm import compression
+
+def print_columnar_logs(data):
+    """按启动记录分组打印列式日志"""
+    columns = data.get("columns", {})
+    threads = data.get("dicts", {}).get("thread", [])
+    levels = data.get("dicts", {}).get("level", [])
+    timestamps = columns.get("timestamp", [])
+    thread_ids = columns.get("thread", [])
+    level_ids = columns.get("level", [])
+    messages = columns.get("message", [])
+
+    if not messages:
+        print("No logs found.")
+        return
+
+    for start in data.get("starts", []):
+        if not start["count"]:
+            continue
+        node = f"节点 {start['node']} " if start.get("node") else ""
+        print(f"\n=== {node}启动记录 {start['start_id']} (启动时间: {start.get('start_time', 'Unknown')}) ===\n")
+        for i in range(start["offset"], start["offset"] + start["count"]):
+            print(f"[{timestamps[i]}] [{threads[thread_ids[i]]}/{levels[level_ids[i]]}]: {messages[i]}")
+
+def fetch_logs(base_url, instance_name, params):
+    """请求日志接口并返回解析后的 JSON"""
+    # 响应体由下面自行解压，只声明 compression 模块支持的算法
+    headers = {"Accept-Encoding": compression.accept_encoding_header()}
+    response = requests.get(f"{base_url}/logs/{instance_name}", params=params,
+                            headers=headers, stream=True)
+    response.raise_for_status()
+
+    # 自行解压，避免依赖 urllib3 对 zstd 的支持
+    raw = response.raw.read(decode_content=False)
+    body = compression.decompress(raw, response.headers.get("Content-Encoding"))
+    return json.loads(body)
 
 def main():
     parser = argparse.ArgumentParser(description="Python Minecraft Server Manager (PMSM)")
-    parser.add_argument("action", choices=["start", "list", "stop", "force-stop", "cmd", "logs"], help="Action to perform")
+    parser.add_argument("action", choices=["start", "list", "stop", "force-stop", "cmd", "logs",
+                                           "backup", "backups", "restore"], help="Action to perform")
     parser.add_argument("--instance", help="Instance name")
     parser.add_argument("--cmd", nargs="+", help="Minecraft command to send")
+    parser.add_argument("--backup-id", help="Backup ID to restore")
+    parser.add_argument("--url", default="http://localhost:8000",
+                        help="PMSM service or coordinator URL (default: http://localhost:8000)")
     
     # 添加日志筛选参数
     parser.add_argument("--start-id", help="Filter by start ID (e.g., '5' or '1-3')")
     parser.add_argument("--start-time", help="Start time in format YYYY-MM-DD HH:MM:SS")
     parser.add_argument("--end-time", help="End time in format YYYY-MM-DD HH:MM:SS")
     parser.add_argument("--search", help="Search string with wildcards (use \\* for literal *)")
+    parser.add_argument("--format", choices=["columnar", "rows"], default="columnar",
+                        help="Log response format (default: columnar, compressed)")
 
     args = parser.parse_args()
 
-    base_url = "http://localhost:8000"
+    base_url = args.url.rstrip("/")
 
     if args.action == "start":
         if not args.instance:
@@ -48,6 +90,31 @@ def main():
             json={"command": command}  # 注意这里是 JSON 格式
         )
         print(response.json())
+    elif args.action == "backup":
+        if not args.instance:
+            print("Error: --instance is required for 'backup' action.")
+            return
+        response = requests.post(f"{base_url}/backup/{args.instance}")
+        print(response.json())
+    elif args.action == "backups":
+        if not args.instance:
+            print("Error: --instance is required for 'backups' action.")
+            return
+        response = requests.get(f"{base_url}/backups/{args.instance}")
+        data = response.json()
+        if response.ok and not data.get("backups"):
+            print("No backups found.")
+        elif response.ok:
+            for backup_id in data["backups"]:
+                print(backup_id)
+        else:
+            print(data)
+    elif args.action == "restore":
+        if not args.instance or not args.backup_id:
+            print("Error: --instance and --backup-id are required for 'restore' action.")
+            return
+        response = requests.post(f"{base_url}/restore/{args.instance}/{args.backup_id}")
+        print(response.json())
     elif args.action == "logs":
         if not args.instance:
             print("Error: --instance is required for 'logs' action.")
@@ -75,14 +142,18 @@ def main():
                 # 直接传递原始搜索模式
                 params["search"] = args.search
 
+            if args.format == "columnar":
+                params["format"] = "columnar"
+
             print(f"Sending request with params: {params}")  # 调试输出
-            response = requests.get(f"{base_url}/logs/{args.instance}", params=params)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = fetch_logs(base_url, args.instance, params)
             if not isinstance(data, dict):
                 print(f"Error: Unexpected response format: {data}")
                 return
+
+            if data.get("format") == "columnar":
+                print_columnar_logs(data)
+                return
                 
             logs = data.get("logs", [])
             if not logs:
@@ -90,13 +161,14 @@ def main():
                 return
 
             # 按启动次数分组显示日志
-            current_start_id = None
+            current_start = None
             for log in logs:
                 try:
                     start_id = log.get('start_id')
-                    if start_id != current_start_id:
-                        current_start_id = start_id
-                        print(f"\n=== 启动记录 {start_id} (启动时间: {log.get('start_time', 'Unknown')}) ===\n")
+                    if (log.get('node'), start_id) != current_start:
+                        current_start = (log.get('node'), start_id)
+                        node = f"节点 {log['node']} " if log.get('node') else ""
+                        print(f"\n=== {node}启动记录 {start_id} (启动时间: {log.get('start_time', 'Unknown')}) ===\n")
                     print(f"[{log['timestamp']}] [{log['thread']}/{log['level']}]: {log['message']}")
                 except KeyError as e:
                     print(f"Error: Missing field in log entry: {e}")
@@ -106,13 +178,22 @@ def main():
             print(f"Error connecting to server: {e}")
         except json.JSONDecodeError as e:
             print(f"Error decoding server response: {e}")
-            print(f"Response content: {response.text}")
+            print(f"Response content: {e.doc[:1000]!r}")
         except Exception as e:
             print(f"Unexpected error: {e}")
             
     elif args.action == "list":
-        # 列出实例的逻辑，可能需要通过API获取
-        print("List of instances not implemented yet.")
+        response = requests.get(f"{base_url}/instances")
+        response.raise_for_status()
+        data = response.json()
+        owners = data.get("owners", {})
+        for instance_name in data.get("instances", []):
+            if instance_name in owners:
+                print(f"{instance_name}\t({owners[instance_name]})")
+            else:
+                print(instance_name)
+        for node_name, error in data.get("errors", {}).items():
+            print(f"Warning: node {node_name} unavailable: {error}")
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,141 @@
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+class BackupNotFoundError(FileNotFoundError):
+    """指定的快照不存在"""
+
+class BackupManager:
+    """管理单个实例 server 目录的增量快照
+
+    每个快照都是一份完整的目录树，与上一个快照相比未变化的文件
+    （大小与修改时间一致）以硬链接方式共享，只有变化的文件才会被复制。
+    """
+
+    def __init__(self, instance_dir, exclude=("logs",)):
+        self.instance_dir = Path(instance_dir)
+        self.server_dir = self.instance_dir / "server"
+        self.backups_dir = self.instance_dir / "backups"
+        self.exclude = set(exclude)
+
+    def list_backups(self):
+        """列出所有已完成的快照，按时间从旧到新排序"""
+        if not self.backups_dir.exists():
+            return []
+        return sorted(
+            (p.name for p in self.backups_dir.iterdir()
+             if p.is_dir() and not p.name.endswith(".partial")),
+            key=self._sort_key
+        )
+
+    @staticmethod
+    def _sort_key(backup_id):
+        """同一秒内的快照带有 -N 后缀，按数值而不是字符串排序"""
+        base, sep, suffix = backup_id.rpartition("-")
+        if sep and base.count("-") == 1 and suffix.isdigit():
+            return (base, int(suffix))
+        return (backup_id, 0)
+
+    def _new_backup_id(self):
+        backup_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        existing = set(self.list_backups())
+        suffix = 1
+        candidate = backup_id
+        while candidate in existing:
+            candidate = f"{backup_id}-{suffix}"
+            suffix += 1
+        return candidate
+
+    def _copy_tree(self, src, dst, prev, exclude=()):
+        """复制目录树，未变化的文件硬链接到 prev 中的同名文件"""
+        stats = {"linked": 0, "copied": 0}
+        dst.mkdir(parents=True, exist_ok=True)
+        for entry in os.scandir(src):
+            if entry.name in exclude:
+                continue
+            src_path = Path(entry.path)
+            dst_path = dst / entry.name
+            prev_path = prev / entry.name if prev is not None else None
+            if entry.is_symlink():
+                os.symlink(os.readlink(src_path), dst_path)
+            elif entry.is_dir():
+                sub = self._copy_tree(
+                    src_path, dst_path,
+                    prev_path if prev_path is not None and prev_path.is_dir() else None
+                )
+                stats["linked"] += sub["linked"]
+                stats["copied"] += sub["copied"]
+            elif entry.is_file():
+                st = entry.stat()
+                if prev_path is not None and self._unchanged(st, prev_path):
+                    os.link(prev_path, dst_path)
+                    stats["linked"] += 1
+                else:
+                    shutil.copy2(src_path, dst_path)
+                    stats["copied"] += 1
+        shutil.copystat(src, dst)
+        return stats
+
+    @staticmethod
+    def _unchanged(st, prev_path):
+        try:
+            prev_st = prev_path.stat()
+        except FileNotFoundError:
+            return False
+        return st.st_size == prev_st.st_size and st.st_mtime_ns == prev_st.st_mtime_ns
+
+    def create_backup(self):
+        """基于上一个快照创建增量快照，返回快照信息"""
+        if not self.server_dir.exists():
+            raise FileNotFoundError(f"Server directory not found: {self.server_dir}")
+
+        backups = self.list_backups()
+        prev = self.backups_dir / backups[-1] if backups else None
+        backup_id = self._new_backup_id()
+        # 先写入临时目录，完成后再重命名，避免留下不完整的快照
+        partial = self.backups_dir / f"{backup_id}.partial"
+        if partial.exists():
+            shutil.rmtree(partial)
+        try:
+            stats = self._copy_tree(self.server_dir, partial, prev, self.exclude)
+            partial.rename(self.backups_dir / backup_id)
+        except Exception:
+            shutil.rmtree(partial, ignore_errors=True)
+            raise
+
+        return {"backup_id": backup_id, **stats}
+
+    def prune(self, keep):
+        """只保留最近的 keep 个快照，返回被删除的快照ID"""
+        if keep < 1:
+            raise ValueError("keep must be at least 1")
+        backups = self.list_backups()
+        removed = backups[:-keep]
+        for backup_id in removed:
+            shutil.rmtree(self.backups_dir / backup_id)
+        return removed
+
+    def restore_backup(self, backup_id):
+        """用指定快照替换 server 目录，调用前实例必须已停止"""
+        backup_dir = self.backups_dir / backup_id
+        if backup_id not in self.list_backups():
+            raise BackupNotFoundError(f"Backup not found: {backup_dir}")
+
+        # 复制而不是硬链接，防止服务器写入时改动快照中的文件
+        restoring = self.instance_dir / "server.restoring"
+        old = self.instance_dir / "server.old"
+        for path in (restoring, old):
+            if path.exists():
+                shutil.rmtree(path)
+        shutil.copytree(backup_dir, restoring, symlinks=True)
+
+        if self.server_dir.exists():
+            # 保留未纳入快照的目录（如 logs）
+            for name in self.exclude:
+                excluded = self.server_dir / name
+                if excluded.exists() and not (restoring / name).exists():
+                    shutil.move(str(excluded), str(restoring / name))
+            self.server_dir.rename(old)
+        restoring.rename(self.server_dir)
+        shutil.rmtree(old, ignore_errors=True)
@@ -0,0 +1,91 @@
+import gzip
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd 为可选依赖
+    zstandard = None
+
+# 小于该字节数的响应不压缩
+MIN_COMPRESS_SIZE = 1024
+
+def supported_encodings():
+    """返回本端支持的压缩算法，按优先级排序"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    encodings.append("gzip")
+    return encodings
+
+def accept_encoding_header():
+    """生成客户端请求使用的 Accept-Encoding 头"""
+    return ", ".join(supported_encodings())
+
+def choose_encoding(accept_encoding):
+    """根据 Accept-Encoding 头选择压缩算法，无可用算法时返回 None"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    for encoding in supported_encodings():
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+def compress(data, encoding):
+    """按指定算法压缩字节串"""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if not encoding or encoding == "identity":
+        return data
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+def decompress(data, encoding):
+    """按指定算法解压字节串，数据损坏或算法不支持时抛出 ValueError"""
+    if not encoding or encoding == "identity":
+        return data
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd response received but zstandard is not installed")
+        # 流式解压，兼容未在帧头写入原始大小的数据
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        try:
+            result = decompressor.decompress(data)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Invalid zstd data: {e}") from e
+        if not decompressor.eof:
+            raise ValueError("Invalid zstd data: truncated frame")
+        return result
+    if encoding == "gzip":
+        try:
+            return gzip.decompress(data)
+        except (OSError, EOFError, zlib.error) as e:
+            raise ValueError(f"Invalid gzip data: {e}") from e
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+def encode_json(payload, accept_encoding):
+    """序列化 JSON 响应体并按 Accept-Encoding 压缩，返回 (body, headers)"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = choose_encoding(accept_encoding)
+    if encoding and len(body) >= MIN_COMPRESS_SIZE:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return body, headers
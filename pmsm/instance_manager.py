@@ -6,10 +6,20 @@ import os
 from pmsm.config_manager import ConfigManager
 import threading
 from pmsm.log_manager import LogManager
+from pmsm.backup_manager import BackupManager
 from datetime import datetime
 
 log_manager = LogManager()
 
+# 备份默认保留的快照数量
+DEFAULT_BACKUP_RETENTION = 10
+
+class InstanceNotFoundError(FileNotFoundError):
+    """实例目录不存在"""
+
+class InstanceBusyError(RuntimeError):
+    """实例正在运行，或正在进行启动/备份/恢复操作"""
+
 class InstanceManager:
     def __init__(self, instances_dir="instances"):
         # 将 instances_dir 转换为绝对路径
@@ -17,14 +27,33 @@ class InstanceManager:
         print("Instances directory:", self.instances_dir)  # 打印实例目录路径
         if not self.instances_dir.exists():
             raise FileNotFoundError(f"Instances directory not found: {self.instances_dir}")
+        # 同一实例的启动、备份与恢复操作互斥
+        self.instance_locks = {}
+        self.instance_locks_guard = threading.Lock()
+        # 由本进程启动的服务器进程，用于判断存活并回收
+        self.processes = {}
+
+    def has_instance(self, instance_name):
+        """判断实例目录是否存在"""
+        return (self.instances_dir / instance_name).is_dir()
+
+    def _get_instance_dir(self, instance_name):
+        instance_dir = self.instances_dir / instance_name
+        if not instance_dir.is_dir():
+            raise InstanceNotFoundError(f"Instance directory not found: {instance_dir}")
+        return instance_dir
 
     def start_instance(self, instance_name):
         """启动指定实例"""
-        instance_dir = self.instances_dir / instance_name
+        instance_dir = self._get_instance_dir(instance_name)
         print("Instance directory:", instance_dir)  # 打印实例目录路径
-        if not instance_dir.exists():
-            raise FileNotFoundError(f"Instance directory not found: {instance_dir}")
+        lock = self._acquire_instance_lock(instance_name)
+        try:
+            self._launch_instance(instance_name, instance_dir)
+        finally:
+            lock.release()
 
+    def _launch_instance(self, instance_name, instance_dir):
         # 加载配置
         config_manager = ConfigManager(instance_dir)
         config = config_manager.load_config()
@@ -71,6 +100,9 @@ class InstanceManager:
             threading.Thread(target=read_output, args=(process.stdout, "OUT"), daemon=True).start()
             threading.Thread(target=read_output, args=(process.stderr, "ERR"), daemon=True).start()
 
+            self.processes[instance_name] = process
+            threading.Thread(target=self._reap_process, args=(instance_name, process), daemon=True).start()
+
             print(f"Started instance {instance_name} with PID {process.pid} and log ID {start_id}")
 
         except Exception as e:
@@ -89,13 +121,151 @@ class InstanceManager:
 
         # 使用进程的标准输入文件发送命令
         try:
-            with open(f"/proc/{pid}/fd/0", "w") as stdin:
-                stdin.write(f"{command}\n")
-                stdin.flush()
+            self._write_stdin(pid, command)
             print(f"Sent command to {instance_name}: {command}")
         except Exception as e:
             print(f"Failed to send command: {e}")
 
+    def _write_stdin(self, pid, command):
+        """写入进程的标准输入，失败时抛出异常"""
+        with open(f"/proc/{pid}/fd/0", "w") as stdin:
+            stdin.write(f"{command}\n")
+            stdin.flush()
+
+    def _reap_process(self, instance_name, process):
+        """等待服务器进程退出并回收，避免留下僵尸进程，同时清除实例状态"""
+        returncode = process.wait()
+        if self.processes.get(instance_name) is process:
+            del self.processes[instance_name]
+        instance_state = log_manager.get_instance_state(instance_name)
+        if instance_state and instance_state["pid"] == process.pid:
+            log_manager.remove_instance_state(instance_name)
+        print(f"Instance {instance_name} (PID {process.pid}) exited with code {returncode}")
+
+    @staticmethod
+    def _process_alive(pid):
+        """通过 /proc/<pid>/stat 判断进程是否存活，僵尸进程视为已退出"""
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                stat = f.read()
+        except (FileNotFoundError, ProcessLookupError):
+            return False
+        # 进程名可能包含空格和括号，状态字段位于最后一个 ")" 之后
+        state = stat.rsplit(")", 1)[-1].split()[0]
+        return state not in ("Z", "X")
+
+    def _get_running_state(self, instance_name):
+        """返回正在运行的实例状态，实例未运行时返回 None 并清除残留状态"""
+        instance_state = log_manager.get_instance_state(instance_name)
+        if not instance_state:
+            return None
+        process = self.processes.get(instance_name)
+        if process is not None and process.pid == instance_state["pid"]:
+            alive = process.poll() is None
+        else:
+            alive = self._process_alive(instance_state["pid"])
+        if not alive:
+            log_manager.remove_instance_state(instance_name)
+            return None
+        return instance_state
+
+    def is_busy(self, instance_name):
+        """判断实例是否正在进行启动/备份/恢复操作"""
+        with self.instance_locks_guard:
+            lock = self.instance_locks.get(instance_name)
+        return lock is not None and lock.locked()
+
+    def _command_and_wait(self, instance_name, instance_state, command, confirmations, timeout):
+        """发送命令并等待服务器主线程输出任一确认信息
+
+        只接受来自 Server thread 且与确认信息完全一致的日志，
+        避免玩家在聊天中输入同样的文字冒充确认。
+        """
+        start_id = instance_state["start_id"]
+        last_id = log_manager.get_last_log_id(instance_name, start_id)
+        try:
+            self._write_stdin(instance_state["pid"], command)
+        except OSError as e:
+            raise RuntimeError(f"Failed to send '{command}' to {instance_name}: {e}") from e
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for log_id, thread, message in log_manager.get_logs_after(instance_name, start_id, last_id):
+                last_id = log_id
+                if thread == "Server thread" and message in confirmations:
+                    return message
+            time.sleep(0.5)
+        raise TimeoutError(f"Timed out waiting for '{command}' confirmation from {instance_name}")
+
+    def _acquire_instance_lock(self, instance_name):
+        with self.instance_locks_guard:
+            lock = self.instance_locks.setdefault(instance_name, threading.Lock())
+        if not lock.acquire(blocking=False):
+            raise InstanceBusyError(f"A start, backup or restore of {instance_name} is already in progress")
+        return lock
+
+    def _get_backup_manager(self, instance_name):
+        instance_dir = self._get_instance_dir(instance_name)
+        config = ConfigManager(instance_dir).load_config()
+        exclude = config.get("backup_exclude", ["logs"])
+        return BackupManager(instance_dir, exclude=exclude), config
+
+    def backup_instance(self, instance_name, timeout=60):
+        """为指定实例创建增量备份
+
+        实例运行时先发送 save-off 与 save-all flush，等待存档完成后再复制，
+        结束后无论成功与否都会发送 save-on。
+        """
+        backup_manager, config = self._get_backup_manager(instance_name)
+        # 在复制任何文件之前校验配置，避免写完快照后才失败
+        retention = config.get("backup_retention", DEFAULT_BACKUP_RETENTION)
+        if isinstance(retention, bool) or not isinstance(retention, int) or retention < 1:
+            raise ValueError(f"Invalid backup_retention for {instance_name}: {retention!r}, "
+                             "expected a positive integer")
+
+        lock = self._acquire_instance_lock(instance_name)
+        try:
+            instance_state = self._get_running_state(instance_name)
+            if instance_state:
+                try:
+                    self._command_and_wait(instance_name, instance_state, "save-off",
+                                           ["Automatic saving is now disabled", "Saving is already turned off"],
+                                           timeout)
+                    self._command_and_wait(instance_name, instance_state, "save-all flush",
+                                           ["Saved the game", "Saved the world"], timeout)
+                    result = backup_manager.create_backup()
+                finally:
+                    try:
+                        self._write_stdin(instance_state["pid"], "save-on")
+                    except Exception as e:
+                        print(f"Failed to re-enable saving for {instance_name}: {e}")
+            else:
+                result = backup_manager.create_backup()
+
+            result["pruned"] = backup_manager.prune(retention)
+        finally:
+            lock.release()
+        print(f"Created backup {result['backup_id']} for {instance_name}: "
+              f"{result['copied']} copied, {result['linked']} linked")
+        return result
+
+    def list_backups(self, instance_name):
+        """列出指定实例的备份"""
+        backup_manager, _ = self._get_backup_manager(instance_name)
+        return backup_manager.list_backups()
+
+    def restore_backup(self, instance_name, backup_id):
+        """从指定备份恢复实例，实例必须处于停止状态"""
+        backup_manager, _ = self._get_backup_manager(instance_name)
+        lock = self._acquire_instance_lock(instance_name)
+        try:
+            # 持锁检查，防止检查之后有新的启动请求
+            if self._get_running_state(instance_name):
+                raise InstanceBusyError(f"Instance {instance_name} is running, stop it before restoring")
+            backup_manager.restore_backup(backup_id)
+        finally:
+            lock.release()
+        print(f"Restored instance {instance_name} from backup {backup_id}")
+
     def stop_instance(self, instance_name):
         """关闭指定实例"""
         self.send_command(instance_name, "stop")
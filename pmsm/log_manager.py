@@ -229,84 +229,91 @@ class LogManager:
                 i += 1
         return f'%{result}%'  # 在两端添加通配符以支持部分匹配
 
+    def _select_starts(self, conn, instance_name, start_id=None, start_id_range=None):
+        """查询符合条件的启动记录，返回 (id, start_time) 列表"""
+        if start_id is not None:  # 使用 is not None 避免 start_id = 0 的情况
+            query = '''
+                SELECT id, start_time 
+                FROM instance_starts 
+                WHERE instance_name = ? AND id = ?
+            '''
+            cursor = conn.execute(query, (instance_name, start_id))
+            return cursor.fetchall()
+        elif start_id_range:
+            start_min, start_max = start_id_range
+            query = '''
+                SELECT id, start_time 
+                FROM instance_starts 
+                WHERE instance_name = ? AND id BETWEEN ? AND ?
+                ORDER BY id DESC
+            '''
+            cursor = conn.execute(query, (instance_name, start_min, start_max))
+            return cursor.fetchall()
+        else:
+            # 默认获取最后一次启动的日志
+            query = '''
+                SELECT id, start_time 
+                FROM instance_starts 
+                WHERE instance_name = ?
+                ORDER BY id DESC
+                LIMIT 1
+            '''
+            cursor = conn.execute(query, (instance_name,))
+            result = cursor.fetchone()
+            return [result] if result else []
+
+    def _iter_log_rows(self, conn, instance_name, start_ids,
+                       start_time=None, end_time=None, search_pattern=None):
+        """按启动记录逐个查询日志表，产出 (start_id, start_time, rows)"""
+        for start_id, start_time_db in start_ids:
+            table_name = self._get_table_name(instance_name, start_id)
+            if not self._table_exists(conn, table_name):
+                continue
+
+            conditions = []
+            params = []
+            
+            if start_time:
+                conditions.append("log_time >= ?")
+                params.append(start_time)
+            if end_time:
+                conditions.append("log_time <= ?")
+                params.append(end_time)
+            if search_pattern:
+                # 转换搜索模式
+                sql_pattern = self._convert_search_pattern(search_pattern)
+                print(f"Search pattern: {search_pattern} -> SQL pattern: {sql_pattern}")  # 调试输出
+                if sql_pattern:
+                    conditions.append("message LIKE ?")  # 只搜索消息内容
+                    params.append(sql_pattern)
+
+            query = f'''
+                SELECT timestamp, thread, level, message, log_time 
+                FROM {table_name}
+                {" WHERE " + " AND ".join(conditions) if conditions else ""}
+                ORDER BY id ASC
+            '''
+            
+            print(f"Executing query: {query} with params: {params}")  # 调试输出
+
+            cursor = conn.execute(query, params)
+            yield start_id, start_time_db, cursor.fetchall()
+
     def get_logs(self, instance_name, start_id=None, start_id_range=None, 
                  start_time=None, end_time=None, search_pattern=None):
         """获取日志记录，支持多种筛选条件"""
         with self.lock:
             conn = self._get_connection()
             try:
-                # 获取启动记录
-                if start_id is not None:  # 使用 is not None 避免 start_id = 0 的情况
-                    query = '''
-                        SELECT id, start_time 
-                        FROM instance_starts 
-                        WHERE instance_name = ? AND id = ?
-                    '''
-                    cursor = conn.execute(query, (instance_name, start_id))
-                    start_ids = cursor.fetchall()
-                elif start_id_range:
-                    start_min, start_max = start_id_range
-                    query = '''
-                        SELECT id, start_time 
-                        FROM instance_starts 
-                        WHERE instance_name = ? AND id BETWEEN ? AND ?
-                        ORDER BY id DESC
-                    '''
-                    cursor = conn.execute(query, (instance_name, start_min, start_max))
-                    start_ids = cursor.fetchall()
-                else:
-                    # 默认获取最后一次启动的日志
-                    query = '''
-                        SELECT id, start_time 
-                        FROM instance_starts 
-                        WHERE instance_name = ?
-                        ORDER BY id DESC
-                        LIMIT 1
-                    '''
-                    cursor = conn.execute(query, (instance_name,))
-                    result = cursor.fetchone()
-                    start_ids = [result] if result else []
-
+                start_ids = self._select_starts(conn, instance_name, start_id, start_id_range)
                 print(f"Found start records: {start_ids}")  # 调试输出
 
                 if not start_ids:
                     return []
 
                 all_logs = []
-                for start_id, start_time_db in start_ids:
-                    table_name = self._get_table_name(instance_name, start_id)
-                    if not self._table_exists(conn, table_name):
-                        continue
-
-                    conditions = []
-                    params = []
-                    
-                    if start_time:
-                        conditions.append("log_time >= ?")
-                        params.append(start_time)
-                    if end_time:
-                        conditions.append("log_time <= ?")
-                        params.append(end_time)
-                    if search_pattern:
-                        # 转换搜索模式
-                        sql_pattern = self._convert_search_pattern(search_pattern)
-                        print(f"Search pattern: {search_pattern} -> SQL pattern: {sql_pattern}")  # 调试输出
-                        if sql_pattern:
-                            conditions.append("message LIKE ?")  # 只搜索消息内容
-                            params.append(sql_pattern)
-
-                    query = f'''
-                        SELECT timestamp, thread, level, message, log_time 
-                        FROM {table_name}
-                        {" WHERE " + " AND ".join(conditions) if conditions else ""}
-                        ORDER BY id ASC
-                    '''
-                    
-                    print(f"Executing query: {query} with params: {params}")  # 调试输出
-
-                    cursor = conn.execute(query, params)
-                    logs = cursor.fetchall()
-                    
+                for start_id, start_time_db, logs in self._iter_log_rows(
+                        conn, instance_name, start_ids, start_time, end_time, search_pattern):
                     all_logs.extend([{
                         'timestamp': log[0],
                         'thread': log[1],
@@ -322,6 +329,87 @@ class LogManager:
             finally:
                 conn.close()
 
+    def get_logs_columnar(self, instance_name, start_id=None, start_id_range=None,
+                          start_time=None, end_time=None, search_pattern=None):
+        """以列式结构获取日志记录，筛选条件与 get_logs 相同
+
+        每个启动记录只输出一次 (start_id, start_time, offset, count)，
+        thread/level 列为指向 dicts 中取值表的下标。
+        """
+        starts = []
+        columns = {
+            'timestamp': [],
+            'thread': [],
+            'level': [],
+            'message': [],
+            'log_time': []
+        }
+        dicts = {'thread': [], 'level': []}
+        with self.lock:
+            conn = self._get_connection()
+            try:
+                start_ids = self._select_starts(conn, instance_name, start_id, start_id_range)
+                print(f"Found start records: {start_ids}")  # 调试输出
+
+                thread_index = {}
+                level_index = {}
+                for start_id, start_time_db, logs in self._iter_log_rows(
+                        conn, instance_name, start_ids, start_time, end_time, search_pattern):
+                    starts.append({
+                        'start_id': start_id,
+                        'start_time': start_time_db,
+                        'offset': len(columns['message']),
+                        'count': len(logs)
+                    })
+                    for timestamp, thread, level, message, log_time in logs:
+                        thread_id = thread_index.get(thread)
+                        if thread_id is None:
+                            thread_id = thread_index[thread] = len(dicts['thread'])
+                            dicts['thread'].append(thread)
+                        level_id = level_index.get(level)
+                        if level_id is None:
+                            level_id = level_index[level] = len(dicts['level'])
+                            dicts['level'].append(level)
+                        columns['timestamp'].append(timestamp)
+                        columns['thread'].append(thread_id)
+                        columns['level'].append(level_id)
+                        columns['message'].append(message)
+                        columns['log_time'].append(log_time)
+            finally:
+                conn.close()
+
+        return {'starts': starts, 'dicts': dicts, 'columns': columns}
+
+    def get_last_log_id(self, instance_name, start_id):
+        """获取指定启动记录中最后一条日志的ID，无日志时返回 0"""
+        with self.lock:
+            conn = self._get_connection()
+            try:
+                table_name = self._get_table_name(instance_name, start_id)
+                if not self._table_exists(conn, table_name):
+                    return 0
+                cursor = conn.execute(f'SELECT MAX(id) FROM {table_name}')
+                result = cursor.fetchone()
+                return result[0] or 0
+            finally:
+                conn.close()
+
+    def get_logs_after(self, instance_name, start_id, after_id):
+        """获取指定启动记录中ID大于 after_id 的日志，返回 (id, thread, message) 列表"""
+        with self.lock:
+            conn = self._get_connection()
+            try:
+                table_name = self._get_table_name(instance_name, start_id)
+                if not self._table_exists(conn, table_name):
+                    return []
+                cursor = conn.execute(
+                    f'SELECT id, thread, message FROM {table_name} WHERE id > ? ORDER BY id ASC',
+                    (after_id,)
+                )
+                return cursor.fetchall()
+            finally:
+                conn.close()
+
     def update_instance_state(self, instance_name, state):
         """更新实例状态到数据库"""
         with self.lock:
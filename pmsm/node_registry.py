@@ -0,0 +1,248 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from pmsm import compression
+
+class NodeError(Exception):
+    """节点返回错误响应或无法访问"""
+
+    def __init__(self, node_name, status_code, detail):
+        super().__init__(f"{node_name}: {detail}" if node_name else str(detail))
+        self.node_name = node_name
+        self.status_code = status_code
+        self.detail = detail
+
+class NodeClient:
+    """单个 PMSM 节点的 HTTP 客户端，复用长连接"""
+
+    def __init__(self, name, url, timeout=10, pool_size=4):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, path, **kwargs):
+        """发送请求并返回解析后的 JSON，失败时抛出 NodeError"""
+        kwargs.setdefault("timeout", self.timeout)
+        # 响应体由下面自行解压，只声明 compression 模块支持的算法
+        headers = {"Accept-Encoding": compression.accept_encoding_header(), **kwargs.pop("headers", {})}
+        try:
+            response = self.session.request(method, f"{self.url}{path}", stream=True,
+                                            headers=headers, **kwargs)
+            # 自行解压，与 pmsm.py 一致，避免依赖 urllib3 对 zstd 的支持
+            raw = response.raw.read(decode_content=False)
+            body = compression.decompress(raw, response.headers.get("Content-Encoding"))
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as e:
+            # 直接读取 raw 时抛出的是 urllib3 的异常，requests 不会再包装
+            raise NodeError(self.name, 502, f"Node unreachable: {e}")
+        except ValueError as e:
+            raise NodeError(self.name, 502, f"Invalid response body from node: {e}")
+
+        try:
+            data = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            raise NodeError(self.name, 502, f"Invalid response from node: {body[:200]!r}")
+        if not response.ok:
+            detail = data.get("detail", data) if isinstance(data, dict) else data
+            raise NodeError(self.name, response.status_code, detail)
+        return data
+
+    def list_instances(self):
+        return self.request("GET", "/instances").get("instances", [])
+
+    def get_logs(self, instance_name, params, columnar=False):
+        if columnar:
+            params = {**params, "format": "columnar"}
+        return self.request("GET", f"/logs/{instance_name}", params=params)
+
+    def close(self):
+        self.session.close()
+
+class NodeRegistry:
+    """协调器持有的节点注册表，负责把实例路由到所属节点"""
+
+    def __init__(self, nodes):
+        self.nodes = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Duplicate node name in registry: {node.name}")
+            self.nodes[node.name] = node
+        if not self.nodes:
+            raise ValueError("No nodes defined in registry")
+
+        self.executor = ThreadPoolExecutor(max_workers=len(self.nodes))
+        self.owners = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, nodes_path="nodes.json"):
+        """从注册表文件创建，文件格式：
+
+            {"nodes": [{"name": "node1", "url": "http://127.0.0.1:8001"}], "timeout": 10}
+        """
+        nodes_path = Path(nodes_path).resolve()
+        if not nodes_path.exists():
+            raise FileNotFoundError(f"Node registry not found: {nodes_path}")
+        with open(nodes_path, "r") as f:
+            config = json.load(f)
+
+        timeout = config.get("timeout", 10)
+        return cls([
+            NodeClient(node["name"], node["url"], timeout=timeout)
+            for node in config.get("nodes", [])
+        ])
+
+    def fan_out(self, func):
+        """在所有节点上并行调用 func(node)，返回 (results, errors)，均按节点名索引"""
+        futures = {name: self.executor.submit(func, node) for name, node in self.nodes.items()}
+        results = {}
+        errors = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except NodeError as e:
+                errors[name] = e
+        return results, errors
+
+    def refresh(self):
+        """重新从所有节点拉取实例列表，更新实例归属表
+
+        无法访问的节点保留上次已知的实例，使对它们的请求返回 502 而不是 404。
+        """
+        results, errors = self.fan_out(lambda node: node.list_instances())
+        owners = {}
+        conflicts = set()
+        for name, instances in results.items():
+            for instance_name in instances:
+                if instance_name in owners:
+                    conflicts.add(instance_name)
+                owners.setdefault(instance_name, name)
+        for instance_name in conflicts:
+            print(f"Warning: instance {instance_name} exists on several nodes, routing to {owners[instance_name]}")
+        with self.lock:
+            for instance_name, name in self.owners.items():
+                if name in errors and instance_name not in owners:
+                    owners[instance_name] = name
+            self.owners = owners
+        return results, errors
+
+    def get_owner(self, instance_name):
+        """返回实例所属节点，未知实例会触发一次刷新"""
+        with self.lock:
+            name = self.owners.get(instance_name)
+        if name is None:
+            self.refresh()
+            with self.lock:
+                name = self.owners.get(instance_name)
+        if name is None:
+            raise NodeError(None, 404, f"Instance not found on any node: {instance_name}")
+        return self.nodes[name]
+
+    def forward(self, method, instance_name, path, **kwargs):
+        """把请求转发给实例所属节点"""
+        node = self.get_owner(instance_name)
+        try:
+            data = node.request(method, path, **kwargs)
+        except NodeError as e:
+            if e.status_code != 404:
+                raise
+            # 缓存的归属可能已过期（实例迁移到了其他节点），刷新后重试一次
+            self.refresh()
+            owner = self.get_owner(instance_name)
+            if owner is node:
+                raise
+            node = owner
+            data = node.request(method, path, **kwargs)
+        if isinstance(data, dict):
+            data.setdefault("node", node.name)
+        return data
+
+    def get_logs(self, instance_name, params, columnar=False):
+        """并行查询所有节点的日志并合并，返回 (merged, errors)
+
+        实例可能在节点间迁移过，因此不只查询当前所属节点。合并后的启动记录
+        按启动时间排序；未指定启动ID时与单个节点一致，只保留最新的一次启动。
+        """
+        results, errors = self.fan_out(
+            lambda node: node.get_logs(instance_name, params, columnar=columnar)
+        )
+        for e in errors.values():
+            # 参数错误在每个节点上都相同，直接抛给调用方
+            if 400 <= e.status_code < 500:
+                raise e
+        if not results:
+            raise NodeError(None, 502, {name: str(e.detail) for name, e in errors.items()})
+
+        # 与 service.py 相同：只有同时给出上下限时才按范围查询
+        latest_only = params.get("start_id") is None and not (
+            params.get("start_id_min") and params.get("start_id_max"))
+        if columnar:
+            return merge_columnar(results, latest_only), errors
+        return {"logs": merge_rows(results, latest_only)}, errors
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        for node in self.nodes.values():
+            node.close()
+
+def merge_columnar(results, latest_only=False):
+    """合并多个节点的列式日志结果
+
+    启动记录按 (启动时间, 节点顺序, 启动ID) 排序，每次启动内的日志保持节点返回的顺序；
+    latest_only 时只保留最新的一次启动。thread/level 取值表按合并结果重新编码。
+    """
+    segments = []
+    for order, (node_name, data) in enumerate(results.items()):
+        for start in data.get("starts", []):
+            segments.append((start.get("start_time") or "", order, start["start_id"], node_name, start, data))
+    segments.sort(key=lambda segment: segment[:3])
+    if latest_only:
+        segments = segments[-1:]
+
+    starts = []
+    columns = {"timestamp": [], "thread": [], "level": [], "message": [], "log_time": []}
+    dicts = {"thread": [], "level": []}
+    indexes = {"thread": {}, "level": {}}
+
+    for _, _, _, node_name, start, data in segments:
+        begin = start["offset"]
+        end = begin + start["count"]
+        starts.append({**start, "offset": len(columns["message"]), "node": node_name})
+        node_columns = data.get("columns", {})
+        for key in ("timestamp", "message", "log_time"):
+            columns[key].extend(node_columns.get(key, [])[begin:end])
+        for key in ("thread", "level"):
+            # 把节点本地的下标映射到合并后的取值表，只收录实际用到的取值
+            values = data.get("dicts", {}).get(key, [])
+            for i in node_columns.get(key, [])[begin:end]:
+                index = indexes[key].get(values[i])
+                if index is None:
+                    index = indexes[key][values[i]] = len(dicts[key])
+                    dicts[key].append(values[i])
+                columns[key].append(index)
+
+    return {"starts": starts, "dicts": dicts, "columns": columns}
+
+def merge_rows(results, latest_only=False):
+    """合并多个节点的逐行日志结果，排序规则与 merge_columnar 相同"""
+    segments = {}
+    for order, (node_name, data) in enumerate(results.items()):
+        for log in data.get("logs", []):
+            key = (node_name, log.get("start_id"))
+            if key not in segments:
+                segments[key] = (log.get("start_time") or "", order, log.get("start_id") or 0, [])
+            segments[key][3].append({**log, "node": node_name})
+
+    ordered = sorted(segments.values(), key=lambda segment: segment[:3])
+    if latest_only:
+        ordered = ordered[-1:]
+    return [log for _, _, _, logs in ordered for log in logs]
@@ -1,8 +1,10 @@
 # service.py
-from fastapi import FastAPI, BackgroundTasks, Body, HTTPException
+from fastapi import FastAPI, BackgroundTasks, Body, HTTPException, Request, Response
 from pydantic import BaseModel
-from pmsm.instance_manager import InstanceManager
+from pmsm.instance_manager import InstanceManager, InstanceNotFoundError, InstanceBusyError
+from pmsm.backup_manager import BackupNotFoundError
 from pmsm.log_manager import LogManager
+from pmsm import compression
 import traceback
 from datetime import datetime
 
@@ -10,41 +12,95 @@ app = FastAPI()
 instance_manager = InstanceManager()
 log_manager = LogManager()
 
+def _require_instance(instance_name):
+    if not instance_manager.has_instance(instance_name):
+        raise HTTPException(status_code=404, detail=f"Instance not found: {instance_name}")
+
 # 定义请求体模型
 class CommandModel(BaseModel):
     command: str
 
+@app.get("/instances")
+def list_instances():
+    return {"status": "success", "instances": instance_manager.list_instances()}
+
 @app.post("/cmd/{instance_name}")
 def send_command(instance_name: str, command_data: CommandModel):
+    _require_instance(instance_name)
     instance_manager.send_command(instance_name, command_data.command)
     return {"status": "command_sent"}
 
 @app.post("/start/{instance_name}")
 def start_instance(instance_name: str, background_tasks: BackgroundTasks):
+    _require_instance(instance_name)
+    if instance_manager.is_busy(instance_name):
+        raise HTTPException(status_code=409, detail=f"A start, backup or restore of {instance_name} is already in progress")
     background_tasks.add_task(instance_manager.start_instance, instance_name)
     return {"status": "starting"}
 
 @app.post("/stop/{instance_name}")
 def stop_instance(instance_name: str):
+    _require_instance(instance_name)
     instance_manager.stop_instance(instance_name)
     return {"status": "stopping"}
 
 @app.post("/force_stop/{instance_name}")
 def force_stop_instance(instance_name: str):
+    _require_instance(instance_name)
     instance_manager.force_stop_instance(instance_name)
     return {"status": "force_stopping"}
 
+def _backup_error(e):
+    """把备份/恢复中的异常转换为 HTTP 错误"""
+    if isinstance(e, (InstanceNotFoundError, BackupNotFoundError)):
+        return HTTPException(status_code=404, detail=str(e))
+    if isinstance(e, InstanceBusyError):
+        return HTTPException(status_code=409, detail=str(e))
+    if isinstance(e, TimeoutError):
+        return HTTPException(status_code=504, detail=str(e))
+    traceback.print_exc()
+    return HTTPException(status_code=500, detail=str(e))
+
+@app.post("/backup/{instance_name}")
+def backup_instance(instance_name: str):
+    try:
+        result = instance_manager.backup_instance(instance_name)
+    except Exception as e:
+        raise _backup_error(e)
+    return {"status": "backed_up", **result}
+
+@app.get("/backups/{instance_name}")
+def list_backups(instance_name: str):
+    try:
+        backups = instance_manager.list_backups(instance_name)
+    except Exception as e:
+        raise _backup_error(e)
+    return {"status": "success", "backups": backups}
+
+@app.post("/restore/{instance_name}/{backup_id}")
+def restore_backup(instance_name: str, backup_id: str):
+    try:
+        instance_manager.restore_backup(instance_name, backup_id)
+    except Exception as e:
+        raise _backup_error(e)
+    return {"status": "restored", "backup_id": backup_id}
+
 @app.get("/logs/{instance_name}")
 async def get_logs(
     instance_name: str,
+    request: Request,
     start_id: int = None,
     start_id_min: int = None,
     start_id_max: int = None,
     start_time: str = None,
     end_time: str = None,
-    search: str = None
+    search: str = None,
+    format: str = "rows"
 ):
     try:
+        if format not in ("rows", "columnar"):
+            raise HTTPException(status_code=400, detail="Invalid format, expected 'rows' or 'columnar'")
+
         # 转换时间字符串为日期时间对象
         start_datetime = None
         end_datetime = None
@@ -61,6 +117,17 @@ async def get_logs(
 
         start_id_range = (start_id_min, start_id_max) if start_id_min and start_id_max else None
         
+        if format == "columnar":
+            result = log_manager.get_logs_columnar(
+                instance_name=instance_name,
+                start_id=start_id,
+                start_id_range=start_id_range,
+                start_time=start_datetime,
+                end_time=end_datetime,
+                search_pattern=search
+            )
+            return _columnar_response(result, request.headers.get("accept-encoding"))
+
         # 直接传递搜索模式
         logs = log_manager.get_logs(
             instance_name=instance_name,
@@ -75,10 +142,21 @@ async def get_logs(
             logs = []
 
         return {"status": "success", "logs": logs}
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+def _columnar_response(result, accept_encoding):
+    """序列化列式日志，并按 Accept-Encoding 协商压缩"""
+    # 绕过 jsonable_encoder，列式数据本身只包含基本类型
+    body, headers = compression.encode_json(
+        {"status": "success", "format": "columnar", **result},
+        accept_encoding
+    )
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # 添加错误处理
 @app.exception_handler(Exception)
 async def generic_exception_handler(request, exc):
@@ -0,0 +1,88 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url, process, timeout=20):
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            requests.get(f"{url}/instances", timeout=1)
+            return
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start in time")
+
+
+@pytest.fixture(scope="session")
+def spawn_app():
+    """用 uvicorn 在空闲端口上启动 service.py 或 coordinator.py，返回其 URL"""
+    processes = []
+
+    def spawn(app, cwd, port=None, env=None):
+        port = port or free_port()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", app, "--app-dir", str(ROOT),
+             "--host", "127.0.0.1", "--port", str(port)],
+            cwd=cwd,
+            env={**os.environ, **(env or {})},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        processes.append(process)
+        url = f"http://127.0.0.1:{port}"
+        _wait_ready(url, process)
+        return url
+
+    yield spawn
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait(timeout=10)
+
+
+@pytest.fixture(scope="session")
+def make_node():
+    """创建节点目录：instances 下的实例目录，以及预先写入日志的 logs.db
+
+    logs 为 {实例名: [(启动时间, [日志行]), ...]}，启动时间为 None 时使用当前时间。
+    """
+    import sqlite3
+
+    from pmsm.log_manager import LogManager
+
+    def make(path, instances, logs=None):
+        for instance_name in instances:
+            (path / "instances" / instance_name / "server").mkdir(parents=True)
+        log_manager = LogManager(db_path=str(path / "logs.db"))
+        for instance_name, starts in (logs or {}).items():
+            for start_time, lines in starts:
+                start_id = log_manager.new_instance_start(instance_name)
+                for line in lines:
+                    log_manager.add_log(instance_name, start_id, line)
+                if start_time:
+                    conn = sqlite3.connect(log_manager.db_path)
+                    conn.execute("UPDATE instance_starts SET start_time = ? WHERE id = ?",
+                                 (start_time, start_id))
+                    conn.commit()
+                    conn.close()
+        return path
+
+    return make
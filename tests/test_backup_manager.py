@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from pmsm.backup_manager import BackupManager, BackupNotFoundError
+
+
+@pytest.fixture
+def instance_dir(tmp_path):
+    server = tmp_path / "server"
+    (server / "world" / "region").mkdir(parents=True)
+    (server / "logs").mkdir()
+    (server / "world" / "region" / "r.0.0.mca").write_bytes(b"a" * 100)
+    (server / "world" / "region" / "r.0.1.mca").write_bytes(b"b" * 100)
+    (server / "logs" / "latest.log").write_text("log")
+    return tmp_path
+
+
+def test_unchanged_files_are_hard_linked(instance_dir):
+    manager = BackupManager(instance_dir)
+    first = manager.create_backup()
+    assert (first["copied"], first["linked"]) == (2, 0)
+
+    region = instance_dir / "server" / "world" / "region"
+    (region / "r.0.1.mca").write_bytes(b"c" * 101)
+    second = manager.create_backup()
+    assert (second["copied"], second["linked"]) == (1, 1)
+
+    snapshot = instance_dir / "backups" / second["backup_id"]
+    assert os.stat(snapshot / "world" / "region" / "r.0.0.mca").st_nlink == 2
+    assert (snapshot / "world" / "region" / "r.0.1.mca").read_bytes() == b"c" * 101
+    assert not (snapshot / "logs").exists()
+
+
+def test_prune_keeps_latest(instance_dir):
+    manager = BackupManager(instance_dir)
+    ids = [manager.create_backup()["backup_id"] for _ in range(3)]
+    assert manager.prune(2) == ids[:1]
+    assert manager.list_backups() == ids[1:]
+    with pytest.raises(ValueError):
+        manager.prune(0)
+
+
+def test_restore_replaces_server_and_keeps_excluded(instance_dir):
+    manager = BackupManager(instance_dir)
+    backup_id = manager.create_backup()["backup_id"]
+    region = instance_dir / "server" / "world" / "region"
+    (region / "r.0.0.mca").write_bytes(b"broken")
+
+    manager.restore_backup(backup_id)
+    assert (region / "r.0.0.mca").read_bytes() == b"a" * 100
+    assert (instance_dir / "server" / "logs" / "latest.log").read_text() == "log"
+    # 恢复出来的文件不能与快照共享 inode
+    assert os.stat(region / "r.0.0.mca").st_nlink == 1
+
+    with pytest.raises(BackupNotFoundError):
+        manager.restore_backup("missing")
+
+
+def test_same_second_backups_sort_numerically(instance_dir):
+    manager = BackupManager(instance_dir)
+    names = ["20260101-120000"] + [f"20260101-120000-{i}" for i in range(1, 12)] + ["20260101-120001"]
+    for name in reversed(names):
+        (instance_dir / "backups" / name).mkdir(parents=True)
+
+    assert manager.list_backups() == names
+    assert manager.prune(2) == names[:-2]
+    assert manager.list_backups() == ["20260101-120000-11", "20260101-120001"]
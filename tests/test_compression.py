@@ -0,0 +1,62 @@
+import gzip
+import json
+
+import pytest
+
+from pmsm import compression
+
+
+def test_choose_encoding_prefers_supported_order():
+    expected = "zstd" if compression.zstandard is not None else "gzip"
+    assert compression.choose_encoding("gzip, zstd") == expected
+
+
+def test_choose_encoding_respects_q_zero_and_wildcard():
+    assert compression.choose_encoding("gzip;q=0") is None
+    assert compression.choose_encoding("gzip;q=0, zstd;q=0") is None
+    if compression.zstandard is None:
+        assert compression.choose_encoding("gzip;q=0, *") is None
+    assert compression.choose_encoding("*") == compression.supported_encodings()[0]
+
+
+def test_choose_encoding_without_acceptable_encoding():
+    assert compression.choose_encoding(None) is None
+    assert compression.choose_encoding("") is None
+    assert compression.choose_encoding("br, deflate") is None
+    assert compression.choose_encoding("gzip;q=abc") is None
+
+
+@pytest.mark.parametrize("encoding", compression.supported_encodings() + [None, "identity"])
+def test_compress_round_trip(encoding):
+    data = b"[12:00:00] [Server thread/INFO]: Done\n" * 200
+    assert compression.decompress(compression.compress(data, encoding), encoding) == data
+
+
+def test_unsupported_encoding():
+    with pytest.raises(ValueError):
+        compression.compress(b"x", "br")
+    with pytest.raises(ValueError):
+        compression.decompress(b"x", "br")
+
+
+def test_encode_json_skips_small_bodies():
+    body, headers = compression.encode_json({"status": "success"}, "gzip")
+    assert json.loads(body) == {"status": "success"}
+    assert "Content-Encoding" not in headers
+    assert headers["Vary"] == "Accept-Encoding"
+
+
+def test_encode_json_compresses_large_bodies():
+    payload = {"columns": {"message": ["Player joined the game"] * 500}}
+    body, headers = compression.encode_json(payload, "gzip")
+    assert headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body)) == payload
+
+
+@pytest.mark.parametrize("encoding", compression.supported_encodings())
+def test_corrupt_data_raises_value_error(encoding):
+    data = compression.compress(b"x" * 2000, encoding)
+    with pytest.raises(ValueError):
+        compression.decompress(data[:len(data) // 2], encoding)
+    with pytest.raises(ValueError):
+        compression.decompress(b"not compressed at all", encoding)
@@ -0,0 +1,90 @@
+"""在本地不同端口上启动两个 service.py 节点和一个协调器，验证路由与日志合并"""
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+pytest.importorskip("pytz")
+requests = pytest.importorskip("requests")
+
+from conftest import free_port
+
+
+@pytest.fixture(scope="module")
+def cluster(tmp_path_factory, spawn_app, make_node):
+    base = tmp_path_factory.mktemp("cluster")
+    # 实例 shared 先在 node2 上运行过，之后迁移到 node1
+    make_node(base / "node1", ["alpha", "shared"], {
+        "shared": [("2026-01-02 10:00:00", ["[10:00:00] [Server thread/INFO]: from node1"])],
+    })
+    make_node(base / "node2", ["beta"], {
+        "shared": [("2026-01-01 09:00:00", ["[09:00:00] [Server thread/WARN]: from node2",
+                                            "[09:00:01] [Worker/INFO]: again node2"])],
+    })
+
+    urls = {name: spawn_app("service:app", base / name) for name in ("node1", "node2")}
+    # 注册表中的第三个节点没有运行
+    urls["down"] = f"http://127.0.0.1:{free_port()}"
+    registry = {"nodes": [{"name": name, "url": url} for name, url in urls.items()], "timeout": 5}
+    (base / "nodes.json").write_text(json.dumps(registry))
+
+    return spawn_app("coordinator:app", base, env={"PMSM_NODES": str(base / "nodes.json")})
+
+
+def test_instances_and_owners(cluster):
+    data = requests.get(f"{cluster}/instances").json()
+    assert data["instances"] == ["alpha", "beta", "shared"]
+    assert data["owners"] == {"alpha": "node1", "beta": "node2", "shared": "node1"}
+    assert list(data["errors"]) == ["down"]
+
+
+def test_commands_are_routed_to_owner(cluster):
+    response = requests.post(f"{cluster}/cmd/beta", json={"command": "say hi"})
+    assert response.status_code == 200
+    assert response.json() == {"status": "command_sent", "node": "node2"}
+
+    response = requests.post(f"{cluster}/stop/alpha")
+    assert response.json() == {"status": "stopping", "node": "node1"}
+
+    response = requests.post(f"{cluster}/start/missing")
+    assert response.status_code == 404
+
+
+def test_logs_default_to_newest_start(cluster):
+    data = requests.get(f"{cluster}/logs/shared").json()
+    assert [(log["node"], log["message"]) for log in data["logs"]] == [("node1", "from node1")]
+    assert list(data["errors"]) == ["down"]
+
+
+def test_logs_are_merged_in_time_order(cluster):
+    data = requests.get(f"{cluster}/logs/shared", params={"start_id_min": 1, "start_id_max": 5}).json()
+    assert [(log["node"], log["message"]) for log in data["logs"]] == [
+        ("node2", "from node2"), ("node2", "again node2"), ("node1", "from node1")]
+    assert list(data["errors"]) == ["down"]
+
+
+def test_columnar_logs_are_merged_in_time_order(cluster):
+    data = requests.get(f"{cluster}/logs/shared",
+                        params={"format": "columnar", "start_id_min": 1, "start_id_max": 5}).json()
+    columns = data["columns"]
+    rows = [
+        (start["node"],
+         data["dicts"]["thread"][columns["thread"][i]],
+         data["dicts"]["level"][columns["level"][i]],
+         columns["message"][i])
+        for start in data["starts"]
+        for i in range(start["offset"], start["offset"] + start["count"])
+    ]
+    assert rows == [
+        ("node2", "Server thread", "WARN", "from node2"),
+        ("node2", "Worker", "INFO", "again node2"),
+        ("node1", "Server thread", "INFO", "from node1"),
+    ]
+    assert [start["start_time"] for start in data["starts"]] == ["2026-01-01 09:00:00", "2026-01-02 10:00:00"]
+    assert list(data["errors"]) == ["down"]
+
+
+def test_invalid_log_query_is_rejected(cluster):
+    response = requests.get(f"{cluster}/logs/shared", params={"start_time": "yesterday"})
+    assert response.status_code == 400
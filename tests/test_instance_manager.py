@@ -0,0 +1,191 @@
+"""用读取标准输入的假服务器进程验证 InstanceManager 的备份流程"""
+import importlib
+import json
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("pytz")
+
+from pmsm.log_manager import LogManager
+
+# 假服务器：按 FAKE_SERVER_MODE 回应 save-off/save-all，并把收到的命令记录到 FAKE_SERVER_RECORD
+FAKE_SERVER = '''#!{python}
+import os, sys, time
+
+mode = os.environ.get("FAKE_SERVER_MODE", "normal")
+record = open(os.environ["FAKE_SERVER_RECORD"], "a")
+
+def log(message, thread="Server thread"):
+    print(time.strftime("[%H:%M:%S]") + f" [{{thread}}/INFO]: " + message, flush=True)
+
+log('Done (1.0s)! For help, type "help"')
+for line in sys.stdin:
+    command = line.strip()
+    record.write(command + "\\n")
+    record.flush()
+    if command == "save-off":
+        log("Automatic saving is now disabled")
+    elif command == "save-all flush":
+        if mode == "chat":
+            # 玩家在聊天中输入确认文字，不能被当作存档完成
+            log("<Steve> Saved the game")
+            log("Saved the game", thread="Worker-1")
+        elif mode == "normal":
+            log("Saving the game (this may take a moment!)")
+            log("Saved the game")
+    elif command == "save-on":
+        log("Automatic saving is now enabled")
+    elif command == "stop":
+        log("Stopping the server")
+        break
+'''
+
+SAVE_CYCLE = ["save-off", "save-all flush", "save-on"]
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    # instance_manager 在导入时会在当前目录创建 logs.db，因此先切换到临时目录
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module("pmsm.instance_manager")
+    monkeypatch.setattr(module, "log_manager", LogManager(db_path=str(tmp_path / "logs.db")))
+
+    instance_dir = tmp_path / "instances" / "mc"
+    (instance_dir / "server" / "world" / "region").mkdir(parents=True)
+    (instance_dir / "server" / "world" / "region" / "r.0.0.mca").write_bytes(b"a" * 100)
+    (instance_dir / "server.jar").touch()
+    fake = instance_dir / "fakejava"
+    fake.write_text(FAKE_SERVER.format(python=sys.executable))
+    fake.chmod(0o755)
+    (instance_dir / "instance.json").write_text(json.dumps({"jdk_path": "fakejava", "server_jar": "server.jar"}))
+
+    record = tmp_path / "commands.txt"
+    record.touch()
+    monkeypatch.setenv("FAKE_SERVER_RECORD", str(record))
+
+    im = module.InstanceManager(tmp_path / "instances")
+    im.record = record
+    yield im, module
+    for process in list(im.processes.values()):
+        process.kill()
+    # 等待回收线程清除实例状态，之后 monkeypatch 才会恢复 log_manager
+    wait_until(lambda: module.log_manager.get_instance_state("mc") is None)
+
+
+def commands(im):
+    return im.record.read_text().split("\n")[:-1]
+
+
+def wait_for_commands(im, expected):
+    """假服务器异步记录命令，等待记录与预期一致"""
+    wait_until(lambda: commands(im) == expected)
+    return commands(im)
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def set_config(instance_dir, **values):
+    path = instance_dir / "instance.json"
+    config = json.loads(path.read_text())
+    config.update(values)
+    path.write_text(json.dumps(config))
+
+
+def test_backup_of_running_instance(manager):
+    im, _ = manager
+    im.start_instance("mc")
+
+    result = im.backup_instance("mc", timeout=5)
+
+    assert wait_for_commands(im, SAVE_CYCLE) == SAVE_CYCLE
+    assert result["copied"] == 1
+    assert im.list_backups("mc") == [result["backup_id"]]
+
+
+def test_chat_is_not_a_confirmation_and_save_on_is_sent(manager, monkeypatch):
+    im, _ = manager
+    monkeypatch.setenv("FAKE_SERVER_MODE", "chat")
+    im.start_instance("mc")
+
+    with pytest.raises(TimeoutError):
+        im.backup_instance("mc", timeout=1)
+
+    assert wait_for_commands(im, SAVE_CYCLE) == SAVE_CYCLE
+    assert im.list_backups("mc") == []
+
+
+def test_save_on_is_sent_when_copy_fails(manager, monkeypatch):
+    im, module = manager
+    im.start_instance("mc")
+
+    def fail(self):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(module.BackupManager, "create_backup", fail)
+    with pytest.raises(OSError):
+        im.backup_instance("mc", timeout=5)
+
+    assert wait_for_commands(im, SAVE_CYCLE) == SAVE_CYCLE
+
+
+@pytest.mark.parametrize("retention", [0, -1, "3", 2.5, True])
+def test_invalid_retention_rejected_before_copying(manager, retention):
+    im, _ = manager
+    set_config(im.instances_dir / "mc", backup_retention=retention)
+    im.start_instance("mc")
+
+    with pytest.raises(ValueError):
+        im.backup_instance("mc", timeout=5)
+
+    assert commands(im) == []
+    assert not (im.instances_dir / "mc" / "backups").exists()
+
+
+def test_busy_instance_is_rejected(manager):
+    im, module = manager
+    lock = im._acquire_instance_lock("mc")
+    try:
+        assert im.is_busy("mc")
+        with pytest.raises(module.InstanceBusyError):
+            im.backup_instance("mc", timeout=5)
+        with pytest.raises(module.InstanceBusyError):
+            im.restore_backup("mc", "any")
+        with pytest.raises(module.InstanceBusyError):
+            im.start_instance("mc")
+    finally:
+        lock.release()
+    assert not im.is_busy("mc")
+
+
+def test_restore_after_normal_stop(manager):
+    im, module = manager
+    im.start_instance("mc")
+    backup_id = im.backup_instance("mc", timeout=5)["backup_id"]
+
+    with pytest.raises(module.InstanceBusyError):
+        im.restore_backup("mc", backup_id)
+
+    im.stop_instance("mc")
+    # 进程退出后被回收，实例状态随之清除
+    assert wait_until(lambda: not im.processes)
+    assert wait_until(lambda: module.log_manager.get_instance_state("mc") is None)
+
+    region = im.instances_dir / "mc" / "server" / "world" / "region" / "r.0.0.mca"
+    region.write_bytes(b"broken")
+    im.restore_backup("mc", backup_id)
+    assert region.read_bytes() == b"a" * 100
+
+
+def test_unknown_instance(manager):
+    im, module = manager
+    with pytest.raises(module.InstanceNotFoundError):
+        im.backup_instance("missing")
@@ -0,0 +1,83 @@
+import pytest
+
+pytest.importorskip("pytz")
+
+from pmsm.log_manager import LogManager
+
+
+@pytest.fixture
+def log_manager(tmp_path):
+    manager = LogManager(db_path=str(tmp_path / "logs.db"))
+    first = manager.new_instance_start("mc")
+    for line in ["[10:00:00] [Server thread/INFO]: Starting",
+                 "[10:00:01] [Worker-1/WARN]: Slow tick",
+                 "not a minecraft line"]:
+        manager.add_log("mc", first, line)
+    second = manager.new_instance_start("mc")
+    for line in ["[11:00:00] [Server thread/INFO]: Starting again",
+                 "[11:00:01] [Server thread/WARN]: Player joined"]:
+        manager.add_log("mc", second, line)
+    return manager
+
+
+def rows(data):
+    columns = data["columns"]
+    return [
+        (start["start_id"],
+         columns["timestamp"][i],
+         data["dicts"]["thread"][columns["thread"][i]],
+         data["dicts"]["level"][columns["level"][i]],
+         columns["message"][i])
+        for start in data["starts"]
+        for i in range(start["offset"], start["offset"] + start["count"])
+    ]
+
+
+def test_columnar_offsets_across_starts(log_manager):
+    data = log_manager.get_logs_columnar("mc", start_id_range=(1, 2))
+
+    assert [(s["start_id"], s["offset"], s["count"]) for s in data["starts"]] == [(2, 0, 2), (1, 2, 3)]
+    assert all(s["start_time"] for s in data["starts"])
+    assert rows(data)[:3] == [
+        (2, "11:00:00", "Server thread", "INFO", "Starting again"),
+        (2, "11:00:01", "Server thread", "WARN", "Player joined"),
+        (1, "10:00:00", "Server thread", "INFO", "Starting"),
+    ]
+    assert rows(data)[4][2:] == ("System", "INFO", "not a minecraft line")
+
+
+def test_columnar_reuses_dictionary_entries(log_manager):
+    data = log_manager.get_logs_columnar("mc", start_id_range=(1, 2))
+
+    assert data["dicts"] == {"thread": ["Server thread", "Worker-1", "System"],
+                             "level": ["INFO", "WARN"]}
+    assert data["columns"]["thread"] == [0, 0, 0, 1, 2]
+    assert data["columns"]["level"] == [0, 1, 0, 1, 0]
+
+
+def test_columnar_matches_row_format(log_manager):
+    logs = log_manager.get_logs("mc", start_id_range=(1, 2))
+    data = log_manager.get_logs_columnar("mc", start_id_range=(1, 2))
+
+    assert [(log["start_id"], log["timestamp"], log["thread"], log["level"], log["message"])
+            for log in logs] == rows(data)
+    assert [log["log_time"] for log in logs] == data["columns"]["log_time"]
+
+
+def test_columnar_default_is_latest_start(log_manager):
+    data = log_manager.get_logs_columnar("mc")
+    assert [s["start_id"] for s in data["starts"]] == [2]
+
+
+def test_columnar_filtered_start_keeps_zero_count(log_manager):
+    data = log_manager.get_logs_columnar("mc", start_id_range=(1, 2), search_pattern="Slow*")
+    assert [(s["start_id"], s["offset"], s["count"]) for s in data["starts"]] == [(2, 0, 0), (1, 0, 1)]
+    assert data["columns"]["message"] == ["Slow tick"]
+
+
+def test_columnar_empty_result(log_manager):
+    assert log_manager.get_logs_columnar("unknown") == {
+        "starts": [],
+        "dicts": {"thread": [], "level": []},
+        "columns": {"timestamp": [], "thread": [], "level": [], "message": [], "log_time": []},
+    }
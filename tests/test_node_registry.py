@@ -0,0 +1,302 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from pmsm import compression
+from pmsm.node_registry import NodeClient, NodeError, NodeRegistry, merge_columnar
+
+
+class StubNode:
+    """模拟 NodeClient，节点上的实例与日志均在内存中"""
+
+    def __init__(self, name, instances=(), logs=None):
+        self.name = name
+        self.url = f"http://{name}"
+        self.instances = set(instances)
+        self.logs = logs or {}
+        self.down = False
+        self.calls = []
+
+    def _check(self):
+        if self.down:
+            raise NodeError(self.name, 502, "Node unreachable")
+
+    def request(self, method, path, **kwargs):
+        self._check()
+        self.calls.append((method, path))
+        instance_name = path.rsplit("/", 1)[-1]
+        if instance_name not in self.instances:
+            raise NodeError(self.name, 404, f"Instance not found: {instance_name}")
+        return {"status": "command_sent"}
+
+    def list_instances(self):
+        self._check()
+        return sorted(self.instances)
+
+    def get_logs(self, instance_name, params, columnar=False):
+        self._check()
+        if params.get("start_time") == "bad":
+            raise NodeError(self.name, 400, "Invalid start_time format")
+        return self.logs.get((instance_name, columnar), {"logs": []})
+
+    def close(self):
+        pass
+
+
+def columnar(starts, threads, levels, rows):
+    return {
+        "status": "success",
+        "format": "columnar",
+        "starts": starts,
+        "dicts": {"thread": threads, "level": levels},
+        "columns": {
+            "timestamp": [r[0] for r in rows],
+            "thread": [r[1] for r in rows],
+            "level": [r[2] for r in rows],
+            "message": [r[3] for r in rows],
+            "log_time": [r[4] for r in rows],
+        },
+    }
+
+
+def decode(data):
+    """把列式结果还原为 (node, start_id, thread, level, message) 列表"""
+    columns = data["columns"]
+    rows = []
+    for start in data["starts"]:
+        for i in range(start["offset"], start["offset"] + start["count"]):
+            rows.append((
+                start.get("node"),
+                start["start_id"],
+                data["dicts"]["thread"][columns["thread"][i]],
+                data["dicts"]["level"][columns["level"][i]],
+                columns["message"][i],
+            ))
+    return rows
+
+
+def test_merge_columnar_remaps_indexes_and_offsets():
+    node1 = columnar(
+        [{"start_id": 2, "start_time": "2026-01-02 10:00:00", "offset": 0, "count": 1},
+         {"start_id": 1, "start_time": "2026-01-01 10:00:00", "offset": 1, "count": 2}],
+        ["Server thread", "System"], ["INFO", "WARN"],
+        [("00:00:01", 0, 0, "a", "x"), ("00:00:02", 1, 1, "b", "x"), ("00:00:03", 0, 1, "c", "x")],
+    )
+    node2 = columnar(
+        [{"start_id": 7, "start_time": "2026-01-01 12:00:00", "offset": 0, "count": 2}],
+        ["Worker", "Server thread"], ["ERROR", "INFO"],
+        [("00:00:04", 0, 0, "d", "x"), ("00:00:05", 1, 1, "e", "x")],
+    )
+    merged = merge_columnar({"node1": node1, "node2": node2})
+
+    # 启动记录按启动时间排序，取值表按首次出现的顺序重新编码
+    assert [(s["node"], s["start_id"], s["offset"], s["count"]) for s in merged["starts"]] == [
+        ("node1", 1, 0, 2), ("node2", 7, 2, 2), ("node1", 2, 4, 1)]
+    assert merged["dicts"] == {"thread": ["System", "Server thread", "Worker"],
+                               "level": ["WARN", "ERROR", "INFO"]}
+    assert decode(merged) == [
+        ("node1", 1, "System", "WARN", "b"),
+        ("node1", 1, "Server thread", "WARN", "c"),
+        ("node2", 7, "Worker", "ERROR", "d"),
+        ("node2", 7, "Server thread", "INFO", "e"),
+        ("node1", 2, "Server thread", "INFO", "a"),
+    ]
+    assert merged["columns"]["timestamp"] == ["00:00:02", "00:00:03", "00:00:04", "00:00:05", "00:00:01"]
+
+
+def test_merge_columnar_latest_only():
+    node1 = columnar([{"start_id": 3, "start_time": "2026-01-01 10:00:00", "offset": 0, "count": 1}],
+                     ["Server thread"], ["INFO"], [("10:00:00", 0, 0, "old run", "x")])
+    node2 = columnar([{"start_id": 1, "start_time": "2026-01-02 09:00:00", "offset": 0, "count": 1}],
+                     ["Worker"], ["WARN"], [("09:00:00", 0, 0, "new run", "x")])
+    merged = merge_columnar({"node1": node1, "node2": node2}, latest_only=True)
+
+    assert decode(merged) == [("node2", 1, "Worker", "WARN", "new run")]
+    assert merged["starts"][0]["offset"] == 0
+    assert merged["dicts"] == {"thread": ["Worker"], "level": ["WARN"]}
+
+
+def test_merge_columnar_empty():
+    assert merge_columnar({}) == {
+        "starts": [], "dicts": {"thread": [], "level": []},
+        "columns": {"timestamp": [], "thread": [], "level": [], "message": [], "log_time": []},
+    }
+
+
+def test_duplicate_node_names_rejected():
+    with pytest.raises(ValueError):
+        NodeRegistry([StubNode("a"), StubNode("a")])
+
+
+def test_forward_routes_to_owner():
+    node1, node2 = StubNode("node1", ["alpha"]), StubNode("node2", ["beta"])
+    registry = NodeRegistry([node1, node2])
+
+    assert registry.forward("POST", "beta", "/start/beta")["node"] == "node2"
+    assert registry.forward("POST", "alpha", "/cmd/alpha")["node"] == "node1"
+    assert node1.calls == [("POST", "/cmd/alpha")]
+    assert node2.calls == [("POST", "/start/beta")]
+
+    with pytest.raises(NodeError) as excinfo:
+        registry.forward("POST", "gamma", "/start/gamma")
+    assert excinfo.value.status_code == 404
+
+
+def test_forward_follows_moved_instance():
+    node1, node2 = StubNode("node1", ["alpha"]), StubNode("node2")
+    registry = NodeRegistry([node1, node2])
+    registry.refresh()
+
+    node1.instances.discard("alpha")
+    node2.instances.add("alpha")
+    assert registry.forward("POST", "alpha", "/stop/alpha")["node"] == "node2"
+    assert registry.owners["alpha"] == "node2"
+
+
+def test_unreachable_node_keeps_last_known_owner():
+    node1, node2 = StubNode("node1", ["alpha"]), StubNode("node2", ["beta"])
+    registry = NodeRegistry([node1, node2])
+    registry.refresh()
+
+    node1.down = True
+    results, errors = registry.refresh()
+    assert list(errors) == ["node1"]
+    assert registry.owners == {"alpha": "node1", "beta": "node2"}
+
+    with pytest.raises(NodeError) as excinfo:
+        registry.forward("POST", "alpha", "/start/alpha")
+    assert excinfo.value.status_code == 502
+
+
+def row(message, start_id, start_time):
+    return {"message": message, "start_id": start_id, "start_time": start_time}
+
+
+def test_get_logs_merges_rows_and_reports_down_node():
+    node1 = StubNode("node1", logs={("alpha", False): {"logs": [
+        row("a2", 2, "2026-01-03 10:00:00"), row("a1", 1, "2026-01-01 10:00:00")]}})
+    node2 = StubNode("node2", logs={("alpha", False): {"logs": [row("b", 1, "2026-01-02 09:00:00")]}})
+    node3 = StubNode("node3")
+    node3.down = True
+    registry = NodeRegistry([node1, node2, node3])
+
+    merged, errors = registry.get_logs("alpha", {"start_id_min": 1, "start_id_max": 2})
+    assert [(log["node"], log["message"]) for log in merged["logs"]] == [
+        ("node1", "a1"), ("node2", "b"), ("node1", "a2")]
+    assert list(errors) == ["node3"]
+
+    # 未指定启动ID时只保留所有节点中最新的一次启动
+    merged, _ = registry.get_logs("alpha", {})
+    assert [(log["node"], log["message"]) for log in merged["logs"]] == [("node1", "a2")]
+
+
+def test_get_logs_columnar_with_down_node():
+    data = columnar([{"start_id": 1, "start_time": "t", "offset": 0, "count": 1}],
+                    ["Server thread"], ["INFO"], [("00:00:01", 0, 0, "a", "x")])
+    node1 = StubNode("node1", logs={("alpha", True): data})
+    node2 = StubNode("node2")
+    node2.down = True
+    registry = NodeRegistry([node1, node2])
+
+    merged, errors = registry.get_logs("alpha", {"start_id": 1}, columnar=True)
+    assert decode(merged) == [("node1", 1, "Server thread", "INFO", "a")]
+    assert list(errors) == ["node2"]
+
+
+def test_get_logs_errors():
+    node1, node2 = StubNode("node1"), StubNode("node2")
+    registry = NodeRegistry([node1, node2])
+
+    with pytest.raises(NodeError) as excinfo:
+        registry.get_logs("alpha", {"start_time": "bad"})
+    assert excinfo.value.status_code == 400
+
+    node1.down = node2.down = True
+    with pytest.raises(NodeError) as excinfo:
+        registry.get_logs("alpha", {})
+    assert excinfo.value.status_code == 502
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """按 server.mode 返回正常、卡在响应体中途或损坏的响应"""
+
+    def do_GET(self):
+        self.server.seen_headers.append(dict(self.headers))
+        body = json.dumps({"status": "success", "instances": ["alpha"], "logs": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if self.server.mode == "stall":
+            # 发送完响应头和部分响应体后停止发送
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[:5])
+            self.wfile.flush()
+            time.sleep(2)
+            return
+        if self.server.mode == "corrupt":
+            body = b"definitely not gzip"
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(mode):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        server.daemon_threads = True
+        server.mode = mode
+        server.seen_headers = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_node_client_sends_own_accept_encoding(stub_server):
+    server, url = stub_server("ok")
+    client = NodeClient("ok", url, timeout=2)
+
+    assert client.list_instances() == ["alpha"]
+    client.get_logs("alpha", {})
+    assert [h["Accept-Encoding"] for h in server.seen_headers] == [compression.accept_encoding_header()] * 2
+
+
+@pytest.mark.parametrize("mode", ["stall", "corrupt"])
+def test_node_client_bad_body_is_node_error(stub_server, mode):
+    _, url = stub_server(mode)
+    client = NodeClient(mode, url, timeout=0.5)
+
+    with pytest.raises(NodeError) as excinfo:
+        client.list_instances()
+    assert excinfo.value.status_code == 502
+    assert excinfo.value.node_name == mode
+
+
+def test_stalled_node_is_reported_in_fan_out(stub_server):
+    _, url = stub_server("stall")
+    good = StubNode("good", ["beta"], logs={("beta", False): {"logs": [row("b", 1, "2026-01-01 10:00:00")]}})
+    registry = NodeRegistry([good, NodeClient("slow", url, timeout=0.5)])
+
+    results, errors = registry.refresh()
+    assert results == {"good": ["beta"]}
+    assert list(errors) == ["slow"]
+
+    merged, errors = registry.get_logs("beta", {})
+    assert [(log["node"], log["message"]) for log in merged["logs"]] == [("good", "b")]
+    assert list(errors) == ["slow"]
@@ -0,0 +1,71 @@
+"""启动真实的 service.py，验证列式日志响应的压缩协商与命令行客户端的解码"""
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+pytest.importorskip("pytz")
+requests = pytest.importorskip("requests")
+
+from pmsm import compression
+
+ROOT = Path(__file__).resolve().parent.parent
+
+LINES = [f"[12:00:{i % 60:02d}] [Server thread/INFO]: Player{i} joined the game" for i in range(300)]
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory, spawn_app, make_node):
+    node = make_node(tmp_path_factory.mktemp("node"), ["mc"], {"mc": [(None, LINES)]})
+    return spawn_app("service:app", node)
+
+
+@pytest.fixture(scope="module")
+def cli():
+    # 仓库根目录下的 pmsm.py 与 pmsm 包同名，按文件路径加载
+    spec = importlib.util.spec_from_file_location("pmsm_cli", ROOT / "pmsm.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("encoding", compression.supported_encodings())
+def test_columnar_response_is_compressed(service, encoding):
+    response = requests.get(f"{service}/logs/mc", params={"format": "columnar"},
+                            headers={"Accept-Encoding": encoding}, stream=True)
+    raw = response.raw.read(decode_content=False)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == encoding
+    data = json.loads(compression.decompress(raw, encoding))
+    assert len(json.dumps(data)) > compression.MIN_COMPRESS_SIZE
+    assert len(raw) < len(json.dumps(data))
+    assert data["format"] == "columnar"
+    assert data["columns"]["message"][-1] == "Player299 joined the game"
+
+
+def test_columnar_response_identity(service):
+    response = requests.get(f"{service}/logs/mc", params={"format": "columnar"},
+                            headers={"Accept-Encoding": "identity"}, stream=True)
+    raw = response.raw.read(decode_content=False)
+
+    assert "Content-Encoding" not in response.headers
+    assert len(json.loads(raw)["columns"]["message"]) == len(LINES)
+
+
+def test_cli_decodes_both_formats(service, cli):
+    data = cli.fetch_logs(service, "mc", {"format": "columnar"})
+    assert data["format"] == "columnar"
+    assert data["dicts"] == {"thread": ["Server thread"], "level": ["INFO"]}
+    assert data["starts"][0]["count"] == len(LINES)
+
+    data = cli.fetch_logs(service, "mc", {})
+    assert [log["message"] for log in data["logs"]] == [line.split(": ", 1)[1] for line in LINES]
+
+
+def test_invalid_format_is_rejected(service):
+    response = requests.get(f"{service}/logs/mc", params={"format": "xml"})
+    assert response.status_code == 400